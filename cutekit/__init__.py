@@ -1,25 +1,45 @@
 import os
+import sys
 import logging
+import logging.handlers
+import importlib
+import threading
+
+from io import TextIOWrapper
+from typing import Any
 
 from . import (
-    builder,  # noqa: F401 this is imported for side effects
-    export,  # noqa: F401 this is imported for side effects
     cli,
     const,
     model,
-    plugins,
-    pods,
     shell,
     vt100,
 )
 
+# These modules are only imported once they are actually needed,
+# either by accessing them as an attribute of the package or when
+# the cli needs one of the commands they register.
+_LAZY_MODULES = ("builder", "export", "mixins", "ninja", "rules")
+
+# Registered before importing pods so the builder and export commands
+# keep their place in the help and usage.
+cli.lazy(*(f"{__name__}.{name}" for name in ("builder", "export")))
+
+from . import plugins, pods  # noqa: E402
+
+_logger = logging.getLogger(__name__)
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_MODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def ensure(version: tuple[int, int, int]):
-    if (
-        const.VERSION[0] == version[0]
-        and const.VERSION[1] == version[1]
-        and const.VERSION[2] >= version[2]
-    ):
+    if const.VERSION[:2] == version[:2] and const.VERSION[2] >= version[2]:
         return
 
     raise RuntimeError(
@@ -27,6 +47,73 @@ def ensure(version: tuple[int, int, int]):
     )
 
 
+class _LazyFileHandler(logging.FileHandler):
+    """
+    A file handler that only creates the log directory and opens
+    the log file once the first record is emitted.
+
+    An existing log is truncated up front, from the thread setting up
+    logging, so the lazy open can append without clobbering what
+    another process wrote in the meantime.
+    """
+
+    def __init__(self, filename: str):
+        super().__init__(filename, "a", delay=True)
+        if os.path.exists(self.baseFilename):
+            open(self.baseFilename, "w").close()
+
+    def _open(self) -> TextIOWrapper:
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class _BufferedHandler(logging.handlers.MemoryHandler):
+    """
+    Buffers records and writes them out in batches, once about 64 KB of
+    messages are pending, on errors, or at most a second after they
+    were logged.
+    """
+
+    MAX_BYTES = 64 * 1024
+    MAX_DELAY = 1.0
+
+    def __init__(self, target: logging.Handler):
+        super().__init__(1000, flushLevel=logging.ERROR, target=target)
+        self._pending = 0
+        self._timer: threading.Timer | None = None
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        self._pending += len(record.getMessage())
+        return self._pending >= self.MAX_BYTES or super().shouldFlush(record)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        super().emit(record)
+        if self.buffer and self._timer is None:
+            self._timer = threading.Timer(self.MAX_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            super().flush()
+            self._pending = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        finally:
+            self.release()
+
+
+_LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+_LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+_LOG_FORMAT_COLOR = f"{vt100.CYAN}%(asctime)s{vt100.RESET} {vt100.YELLOW}%(levelname)s{vt100.RESET} %(name)s: %(message)s"
+
+
+def _useColor() -> bool:
+    return sys.stderr.isatty() and "NO_COLOR" not in os.environ
+
+
 class logger:
     class LoggerArgs:
         verbose: bool = cli.arg(None, "verbose", "Enable verbose logging")
@@ -36,8 +123,8 @@ class logger:
         if args.verbose:
             logging.basicConfig(
                 level=logging.DEBUG,
-                format=f"{vt100.CYAN}%(asctime)s{vt100.RESET} {vt100.YELLOW}%(levelname)s{vt100.RESET} %(name)s: %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
+                format=_LOG_FORMAT_COLOR if _useColor() else _LOG_FORMAT,
+                datefmt=_LOG_DATEFMT,
             )
         else:
             projectRoot = model.Project.topmost()
@@ -45,15 +132,16 @@ class logger:
             if projectRoot is not None:
                 logFile = os.path.join(projectRoot.dirname(), const.PROJECT_LOG_FILE)
 
-            shell.mkdir(os.path.dirname(logFile))
+            handler = _LazyFileHandler(logFile)
+            handler.setFormatter(logging.Formatter(_LOG_FORMAT, datefmt=_LOG_DATEFMT))
 
-            logging.basicConfig(
-                level=logging.INFO,
-                filename=logFile,
-                filemode="w",
-                format="%(asctime)s %(levelname)s %(name)s: %(message)s",
-                datefmt="%Y-%m-%d %H:%M:%S",
-            )
+            # Errors are written right away and logging.shutdown()
+            # flushes the rest when the process exits.
+            buffered = _BufferedHandler(handler)
+
+            root = logging.getLogger()
+            root.setLevel(logging.INFO)
+            root.addHandler(buffered)
 
 
 class RootArgs(
@@ -89,7 +177,7 @@ def main() -> int:
         return 0
 
     except RuntimeError as e:
-        logging.exception(e)
+        _logger.exception("cutekit failed: %s", e)
         vt100.error(str(e))
         return 1
 
@@ -1,15 +1,79 @@
+"""
+Generates build.ninja files for a target and drives ninja.
+
+Generation is bound by filesystem enumeration, then by allocating path
+strings and writing ninja text, not by computation. Speedups come from
+skipping work (stamps, caches), batching directory listings and
+overlapping I/O.
+"""
+
+import io
 import os
+import json
+import re
+import fnmatch
+import functools
 import logging
+import threading
 import dataclasses as dt
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Callable, Literal, TextIO, Union
 
-from . import cli, shell, rules, model, ninja, const, vt100, mixins
+from . import cli, shell, model, ninja, const, utils, vt100
 
 _logger = logging.getLogger(__name__)
 
 
+# Resolved build directories, keyed by (working directory, builddir)
+_resolvedBuilddirs: dict[tuple[str, str], str] = {}
+
+# Source directories of every component, keyed by scope
+_subdirsCache: dict[str, list[str]] = {}
+
+# Entries of every directory listed so far, missing directories are empty
+_listdirCache: dict[str, list[str]] = {}
+
+
+def _listdir(path: str) -> list[str]:
+    # Targets share their source directories, list each of them once
+    res = _listdirCache.get(path)
+    if res is None:
+        try:
+            with os.scandir(path) as it:
+                res = [e.name for e in it]
+        except (FileNotFoundError, NotADirectoryError):
+            res = []
+        _listdirCache[path] = res
+    return res
+
+
+@functools.cache
+def _globExts(wildcards: tuple[str, ...]) -> frozenset[str] | None:
+    # The extensions matched by a group of plain "*.ext" wildcards,
+    # or None when any of them needs a real glob.
+    if not wildcards:
+        return None
+    exts: set[str] = set()
+    for w in wildcards:
+        if not w.startswith("*."):
+            return None
+        ext = os.path.normcase(w[1:])
+        if len(ext) < 2 or any(c in "*?[./\\" for c in ext[1:]):
+            return None
+        exts.add(ext)
+    return frozenset(exts)
+
+
+@functools.cache
+def _globMatcher(wildcards: tuple[str, ...]) -> Callable[[str], object]:
+    # One regex for the whole group instead of an fnmatch() per wildcard,
+    # no wildcard at all matches everything, like shell.find()
+    pattern = "|".join(fnmatch.translate(os.path.normcase(w)) for w in wildcards)
+    return re.compile(pattern).match
+
+
 @dt.dataclass
 class Scope:
     registry: model.Registry
@@ -68,16 +132,74 @@ class ComponentScope(TargetScope):
         return ProductScope(self.registry, self.target, self.component, path)
 
     def subdirs(self) -> list[str]:
-        component = self.component
-        result = [component.dirname()]
-        for subs in component.subdirs:
-            result.append(os.path.join(component.dirname(), subs))
-        return result
+        key = self.key()
+        result = _subdirsCache.get(key)
+        if result is None:
+            base = self.component.dirname()
+            result = [base]
+            for subs in self.component.subdirs:
+                result.append(os.path.join(base, subs))
+            _subdirsCache[key] = result
+        return list(result)
+
+    @functools.cached_property
+    def _listing(self) -> list[tuple[str, str]]:
+        # Every rule looks for its sources in the same directories,
+        # so they are only listed once per component.
+        res: list[tuple[str, str]] = []
+        for d in self.subdirs():
+            res.extend((d, f) for f in _listdir(d))
+        return res
 
     def wilcard(self, wildcards: list[str] | str) -> list[str]:
         if isinstance(wildcards, str):
             wildcards = [wildcards]
-        return shell.find(self.subdirs(), wildcards, recusive=False)
+        return self.wilcards([wildcards])[0]
+
+    def wilcards(self, groups: list[list[str]]) -> list[list[str]]:
+        """
+        Same as wilcard() for several groups of wildcards at once,
+        sorting the listing into one bucket per group in a single pass.
+        """
+        _logger.debug(f"Looking for files in {self.subdirs()} matching {groups}")
+        # Groups made only of "*.ext" wildcards are dispatched on the
+        # extension, the others go through their regex.
+        byExt: dict[str, list[list[str]]] = {}
+        matchers: list[tuple[Callable[[str], object], list[str]]] = []
+        res: list[list[str]] = [[] for _ in groups]
+        for g, bucket in zip(groups, res):
+            exts = _globExts(tuple(g))
+            if exts is None:
+                matchers.append((_globMatcher(tuple(g)), bucket))
+                continue
+            for ext in exts:
+                byExt.setdefault(ext, []).append(bucket)
+
+        for d, f in self._listing:
+            name = os.path.normcase(f)
+            dot = name.rfind(".")
+            if dot >= 0:
+                for bucket in byExt.get(name[dot:], ()):
+                    bucket.append(os.path.join(d, f))
+            for match, bucket in matchers:
+                if match(name):
+                    bucket.append(os.path.join(d, f))
+        for bucket in res:
+            bucket.sort()
+        return res
+
+    @functools.cached_property
+    def _edgeVars(self) -> dict[str, str]:
+        # Shared by every build statement of the component, the
+        # writer only reads it.
+        return {
+            "ck_target": self.target.id,
+            "ck_component": self.component.id,
+        }
+
+    @functools.cached_property
+    def _objPrefix(self) -> str:
+        return os.path.join(self.target.builddir, self.component.id, "__obj__") + os.sep
 
     def buildpath(self, path: str | Path) -> Path:
         return Path(self.target.builddir) / self.component.id / path
@@ -86,9 +208,20 @@ class ComponentScope(TargetScope):
         return Path(const.GENERATED_DIR) / self.component.id / path
 
     def useEnv(self):
-        os.environ["CK_TARGET"] = self.target.id
-        os.environ["CK_BUILDDIR"] = str(Path(self.target.builddir).resolve())
-        os.environ["CK_COMPONENT"] = self.component.id
+        key = (os.getcwd(), self.target.builddir)
+        builddir = _resolvedBuilddirs.get(key)
+        if builddir is None:
+            builddir = _resolvedBuilddirs[key] = str(Path(key[1]).resolve())
+
+        env = {
+            "CK_TARGET": self.target.id,
+            "CK_BUILDDIR": builddir,
+            "CK_COMPONENT": self.component.id,
+        }
+        # Every assignment to os.environ goes through putenv()
+        for k, v in env.items():
+            if os.environ.get(k) != v:
+                os.environ[k] = v
 
 
 @dt.dataclass
@@ -109,13 +242,47 @@ class ProductScope(ComponentScope):
 Compute = Callable[[TargetScope], list[str]]
 _vars: dict[str, Compute] = {}
 
+# Results of every var, see _resetCaches()
+_varCaches: list[dict[str, list[str]]] = []
+
 Hook = Callable[[TargetScope], None]
 _hooks: dict[str, Hook] = {}
 
+# Hooks already run in this process, as (hook name, scope key)
+_ranHooks: set[tuple[str, str]] = set()
+_hooksLock = threading.Lock()
+
+
+def _forgetHooks():
+    # What the hooks generated may be gone, run them again next build
+    with _hooksLock:
+        _ranHooks.clear()
+    _resetCaches()
+
+
+# Snapshots of _vars and _hooks, taken on first use and
+# dropped whenever a new var or hook is registered
+_varsFrozen: tuple[tuple[str, Compute], ...] | None = None
+_hooksFrozen: tuple[tuple[str, Hook], ...] | None = None
+
 
 def var(name: str) -> Callable[[Compute], Compute]:
     def decorator(func: Compute):
-        _vars[name] = func
+        global _varsFrozen
+        # Results only depend on the registry and the target, both of
+        # which are captured by the scope key
+        cache: dict[str, list[str]] = {}
+        _varCaches.append(cache)
+
+        def cached(scope: TargetScope) -> list[str]:
+            key = scope.key()
+            res = cache.get(key)
+            if res is None:
+                res = cache[key] = func(scope)
+            return list(res)
+
+        _vars[name] = cached
+        _varsFrozen = None
         return func
 
     return decorator
@@ -123,12 +290,28 @@ def var(name: str) -> Callable[[Compute], Compute]:
 
 def hook(name: str) -> Callable[[Hook], Hook]:
     def decorator(func: Hook):
+        global _hooksFrozen
         _hooks[name] = func
+        _hooksFrozen = None
         return func
 
     return decorator
 
 
+def _frozenVars() -> tuple[tuple[str, Compute], ...]:
+    global _varsFrozen
+    if _varsFrozen is None:
+        _varsFrozen = tuple(_vars.items())
+    return _varsFrozen
+
+
+def _frozenHooks() -> tuple[tuple[str, Hook], ...]:
+    global _hooksFrozen
+    if _hooksFrozen is None:
+        _hooksFrozen = tuple(_hooks.items())
+    return _hooksFrozen
+
+
 @var("builddir")
 def _computeBuilddir(scope: TargetScope) -> list[str]:
     """
@@ -160,117 +343,235 @@ def _computeCinc(scope: TargetScope) -> list[str]:
         elif c.type == model.Kind.LIB:
             res.add(str(Path(c.dirname()).parent))
 
-    return sorted(map(lambda i: f"-I{i}", res))
+    return [f"-I{i}" for i in sorted(res)]
+
+
+_SANATIZE_TABLE = str.maketrans(" -.", "___")
+_SANATIZE_RE = re.compile(r"\W")
+
+
+@functools.cache
+def _sanatize(s: str) -> str:
+    return _SANATIZE_RE.sub("", s.translate(_SANATIZE_TABLE))
 
 
 @var("cdefs")
 def _computeCdef(scope: TargetScope) -> list[str]:
     res = set()
 
-    def sanatize(s: str) -> str:
-        TO_REPLACE = [" ", "-", "."]  # -> "_"
-        for r in TO_REPLACE:
-            s = s.replace(r, "_")
-        return "".join(filter(lambda c: c.isalnum() or c == "_", s))
-
     for k, v in scope.target.props.items():
         if isinstance(v, bool):
             if v:
-                res.add(f"-D__ck_{sanatize(k)}__")
+                res.add(f"-D__ck_{_sanatize(k)}__")
         else:
-            res.add(f"-D__ck_{sanatize(k)}_{sanatize(str(v))}__")
-            res.add(f"-D__ck_{sanatize(k)}_value={str(v)}")
+            res.add(f"-D__ck_{_sanatize(k)}_{_sanatize(str(v))}__")
+            res.add(f"-D__ck_{_sanatize(k)}_value={str(v)}")
 
     return sorted(res)
 
 
 # --- Compilation ------------------------------------------------------------ #
 
+# Component scopes keyed by target scope and component, shared by
+# everything that refers to the same component while generating a target.
+_componentScopes: dict[tuple[str, str], ComponentScope] = {}
+
+
+def _componentScope(scope: TargetScope, c: model.Component) -> ComponentScope:
+    # scope may itself be a component scope, only its target part matters
+    key = (TargetScope.key(scope), c.id)
+    res = _componentScopes.get(key)
+    if res is None:
+        res = _componentScopes[key] = scope.openComponentScope(c)
+    return res
+
+
+def _relpath(path: str, base: str) -> str:
+    # Same result as Path.relative_to() but without the Path objects,
+    # paths that are not plainly under base go the slow way.
+    prefix = base + os.sep
+    if path.startswith(prefix):
+        rel = path[len(prefix) :]
+        if rel and rel[0] != os.sep and os.path.normpath(rel) == rel:
+            return rel
+    return str(Path(path).relative_to(base))
+
+
+def objpath(scope: ComponentScope, src: str) -> str:
+    return scope._objPrefix + _relpath(src, scope.component.dirname()) + ".o"
+
+
+def _buildObj(
+    w: ninja.Writer,
+    scope: ComponentScope,
+    rule: str,
+    src: str,
+    dest: str,
+    files: list[str],
+):
+    w.build(
+        dest,
+        rule,
+        inputs=src,
+        order_only=files,
+        variables=scope._edgeVars,
+    )
+
 
 def compile(
     w: ninja.Writer | None, scope: ComponentScope, rule: str, srcs: list[str]
 ) -> list[str]:
     res: list[str] = []
+    files = scope.target.tools[rule].files if w else []
     for src in srcs:
-        rel = Path(src).relative_to(scope.component.dirname())
-        dest = scope.buildpath(path="__obj__") / rel.with_suffix(rel.suffix + ".o")
-        t = scope.target.tools[rule]
+        dest = objpath(scope, src)
         if w:
-            w.build(
-                str(dest),
-                rule,
-                inputs=src,
-                order_only=t.files,
-                variables={
-                    "ck_target": scope.target.id,
-                    "ck_component": scope.component.id,
-                },
-            )
-        res.append(str(dest))
+            _buildObj(w, scope, rule, src, dest, files)
+        res.append(dest)
     return res
 
 
-def compileObjs(w: ninja.Writer | None, scope: ComponentScope) -> list[str]:
-    objs = []
-    for rule in rules.rules.values():
-        if rule.id not in ["cp", "ld", "ar"]:
-            objs += compile(w, scope, rule.id, srcs=scope.wilcard(rule.fileIn))
+# Rules that produce something other than objects from sources
+_NON_COMPILE_RULES = frozenset(("cp", "ld", "ar"))
+
+# (rule, src, dest) of every object of a component, keyed by scope
+_objsCache: dict[str, list[tuple[str, str, str]]] = {}
+
+
+def listObjs(scope: ComponentScope) -> list[tuple[str, str, str]]:
+    key = scope.key()
+    objs = _objsCache.get(key)
+    if objs is None:
+        from . import rules
+
+        objs = []
+        compileRules = [
+            rule for rule in rules.rules.values() if rule.id not in _NON_COMPILE_RULES
+        ]
+        srcs = scope.wilcards([rule.fileIn for rule in compileRules])
+        for rule, ruleSrcs in zip(compileRules, srcs):
+            for src in ruleSrcs:
+                objs.append((rule.id, src, objpath(scope, src)))
+        _objsCache[key] = objs
     return objs
 
 
+def _buildObjs(
+    w: ninja.Writer | None, scope: ComponentScope, objs: list[tuple[str, str, str]]
+) -> list[str]:
+    res: list[str] = []
+    tools = scope.target.tools
+    for rule, src, dest in objs:
+        if w:
+            _buildObj(w, scope, rule, src, dest, tools[rule].files)
+        res.append(dest)
+    return res
+
+
+def compileObjs(w: ninja.Writer | None, scope: ComponentScope) -> list[str]:
+    return _buildObjs(w, scope, listObjs(scope))
+
+
 # --- Ressources ------------------------------------------------------------- #
 
 
+# (directories, files) under the res/ directory of each component, walked
+# once and shared by listRes(), _resPaths() and _fingerprint(), missing
+# ones included
+_resTreeCache: dict[str, tuple[list[str], list[str]]] = {}
+
+
+def _resTree(component: model.Component) -> tuple[list[str], list[str]]:
+    root = str(component.subpath("res"))
+    tree = _resTreeCache.get(root)
+    if tree is None:
+        dirs: list[str] = []
+        files: list[str] = []
+        for d, _, names in os.walk(root):
+            dirs.append(d)
+            files.extend(os.path.join(d, f) for f in names)
+        tree = _resTreeCache[root] = (dirs, files)
+    return tree
+
+
 def listRes(component: model.Component) -> list[str]:
-    return shell.find(str(component.subpath("res")))
+    return list(_resTree(component)[1])
 
 
-def compileRes(
-    w: ninja.Writer,
-    scope: ComponentScope,
+def _resPaths(scope: ComponentScope) -> list[tuple[str, str]]:
+    resDir = str(scope.component.subpath("res"))
+    prefix = os.path.join(scope.target.builddir, scope.component.id, "__res__")
+    return [
+        (r, prefix + os.sep + _relpath(r, resDir)) for r in _resTree(scope.component)[1]
+    ]
+
+
+def _buildRes(
+    w: ninja.Writer, scope: ComponentScope, paths: list[tuple[str, str]]
 ) -> list[str]:
     res: list[str] = []
-    for r in listRes(scope.component):
-        rel = Path(r).relative_to(scope.component.subpath("res"))
-        dest = scope.buildpath("__res__") / rel
+    for src, dest in paths:
         w.build(
-            str(dest),
+            dest,
             "cp",
-            r,
-            variables={
-                "ck_target": scope.target.id,
-                "ck_component": scope.component.id,
-            },
+            src,
+            variables=scope._edgeVars,
         )
-        res.append(str(dest))
+        res.append(dest)
     return res
 
 
+def compileRes(
+    w: ninja.Writer,
+    scope: ComponentScope,
+) -> list[str]:
+    return _buildRes(w, scope, _resPaths(scope))
+
+
 # --- Linking ---------------------------------------------------------------- #
 
 
+# Output file of every component, keyed by scope
+_outfileCache: dict[str, str] = {}
+
+
 def outfile(scope: ComponentScope) -> str:
-    if scope.component.type == model.Kind.LIB:
-        return str(scope.buildpath(f"__lib__/{scope.component.id}.a"))
-    else:
-        return str(scope.buildpath(f"__bin__/{scope.component.id}.out"))
+    key = scope.key()
+    res = _outfileCache.get(key)
+    if res is None:
+        # Built the same way as objpath(), without going through Path
+        base = os.path.join(scope.target.builddir, scope.component.id)
+        if scope.component.type == model.Kind.LIB:
+            res = os.path.join(base, "__lib__", f"{scope.component.id}.a")
+        else:
+            res = os.path.join(base, "__bin__", f"{scope.component.id}.out")
+        _outfileCache[key] = res
+    return res
+
+
+# Libraries linked by every component, keyed by scope
+_libsCache: dict[str, list[str]] = {}
 
 
 def collectLibs(
     scope: ComponentScope,
 ) -> list[str]:
-    res: list[str] = []
-    for r in scope.component.resolved[scope.target.id].required:
-        req = scope.registry.lookup(r, model.Component)
-        assert req is not None  # model.Resolver has already checked this
+    key = scope.key()
+    res = _libsCache.get(key)
+    if res is None:
+        res = []
+        for r in scope.component.resolved[scope.target.id].required:
+            req = scope.registry.lookup(r, model.Component)
+            assert req is not None  # model.Resolver has already checked this
 
-        if r == scope.component.id:
-            continue
-        if not req.type == model.Kind.LIB:
-            raise RuntimeError(f"Component {r} is not a library")
-        res.append(outfile(scope.openComponentScope(req)))
+            if r == scope.component.id:
+                continue
+            if not req.type == model.Kind.LIB:
+                raise RuntimeError(f"Component {r} is not a library")
+            res.append(outfile(_componentScope(scope, req)))
+        _libsCache[key] = res
 
-    return res
+    return list(res)
 
 
 def collectInjectedObjs(scope: ComponentScope) -> list[str]:
@@ -283,132 +584,470 @@ def collectInjectedObjs(scope: ComponentScope) -> list[str]:
             continue
         if not req.type == model.Kind.LIB:
             raise RuntimeError(f"Component {r} is not a library")
-        res.extend(compileObjs(None, scope.openComponentScope(req)))
+        res.extend(dest for _, _, dest in listObjs(_componentScope(scope, req)))
 
     return res
 
 
-def link(
-    w: ninja.Writer,
-    scope: ComponentScope,
-) -> str:
+@dt.dataclass
+class _LinkPlan:
+    """
+    Everything needed to write the build statements of a component,
+    gathered without touching the ninja writer.
+    """
+
+    scope: ComponentScope
+    out: str
+    res: list[tuple[str, str]]
+    objs: list[tuple[str, str, str]]
+    injectedObjs: list[str] = dt.field(default_factory=list)
+    libs: list[str] = dt.field(default_factory=list)
+
+
+def _gatherLink(scope: ComponentScope) -> _LinkPlan:
+    plan = _LinkPlan(scope, outfile(scope), _resPaths(scope), listObjs(scope))
+    if scope.component.type != model.Kind.LIB:
+        plan.injectedObjs = collectInjectedObjs(scope)
+        plan.libs = collectLibs(scope)
+    return plan
+
+
+def _dedup(scope: ComponentScope, what: str, paths: list[str]) -> list[str]:
+    res = list(dict.fromkeys(paths))
+    if len(res) != len(paths):
+        _logger.warning(
+            f"Dropped {len(paths) - len(res)} duplicated {what} when linking {scope.component.id}"
+        )
+    return res
+
+
+def _buildLink(w: ninja.Writer, plan: _LinkPlan) -> str:
+    scope = plan.scope
     w.newline()
-    out = outfile(scope)
 
-    res = compileRes(w, scope)
-    objs = compileObjs(w, scope)
+    res = _buildRes(w, scope, plan.res)
+    objs = _buildObjs(w, scope, plan.objs)
     if scope.component.type == model.Kind.LIB:
         w.build(
-            out,
+            plan.out,
             "ar",
             objs,
             implicit=res,
-            variables={
-                "ck_target": scope.target.id,
-                "ck_component": scope.component.id,
-            },
+            variables=scope._edgeVars,
         )
     else:
-        injectedObjs = collectInjectedObjs(scope)
-        libs = collectLibs(scope)
+        linkObjs = _dedup(scope, "objects", objs + plan.injectedObjs)
         w.build(
-            out,
+            plan.out,
             "ld",
-            objs + libs,
+            objs + plan.libs,
             variables={
-                "objs": " ".join(objs + injectedObjs),
-                "libs": " ".join(libs),
-                "ck_target": scope.target.id,
-                "ck_component": scope.component.id,
+                "objs": " ".join(linkObjs),
+                "libs": " ".join(plan.libs),
+                **scope._edgeVars,
             },
             implicit=res,
         )
-    return out
+    return plan.out
+
+
+def link(
+    w: ninja.Writer,
+    scope: ComponentScope,
+) -> str:
+    return _buildLink(w, _gatherLink(scope))
 
 
 # --- Phony ------------------------------------------------------------------ #
 
 
-def all(w: ninja.Writer, scope: TargetScope) -> list[str]:
+def all(
+    w: ninja.Writer,
+    scope: TargetScope,
+    fragments: dict[str, io.StringIO] | None = None,
+) -> list[str]:
+    # Gathering sources and paths is mostly directory listing, so it is
+    # spread over threads, the writer itself is not thread-safe and the
+    # build statements are written in order afterward.
+    scopes = [
+        _componentScope(scope, c) for c in scope.registry.iterEnabled(scope.target)
+    ]
+    with ThreadPoolExecutor() as executor:
+        plans = list(executor.map(_gatherLink, scopes))
+
     all: list[str] = []
-    for c in scope.registry.iterEnabled(scope.target):
-        all.append(link(w, scope.openComponentScope(c)))
+    for plan in plans:
+        if fragments is None:
+            all.append(_buildLink(w, plan))
+            continue
+
+        # Each component goes to its own subninja, so only the ones
+        # that actually changed get rewritten. It lives in the build
+        # directory of the component so it can't collide with build.ninja.
+        path = os.path.join(
+            scope.target.builddir, plan.scope.component.id, "build.ninja"
+        )
+        buf = fragments[path] = io.StringIO()
+        cw = _subWriter(w, buf)
+        cw.comment("File generated by the build system, do not edit")
+        all.append(_buildLink(cw, plan))
+        w.subninja(path)
     w.build("all", "phony", all)
     w.default("all")
     return all
 
 
+# Flags added by the ck-lto prop, for each tool flags variable
+_LTO_FLAGS: dict[str, list[str]] = {
+    "thin": ["-flto=thin"],
+    "full": ["-flto"],
+    "off": [],
+}
+
+
+def _isGcc(tool: model.Tool) -> bool:
+    cmd = os.path.basename(tool.cmd)
+    return "clang" not in cmd and ("gcc" in cmd or "g++" in cmd)
+
+
+def _isLtoFlag(flag: str) -> bool:
+    # Leaves -flto-partition= and friends alone
+    return flag == "-flto" or flag.startswith("-flto=")
+
+
+def _applyLto(target: model.Target, name: str, var: list[str]) -> list[str]:
+    lto = target.props.get("ck-lto")
+    if not lto or name not in ("ccflags", "cxxflags", "ldflags"):
+        return var
+    if lto not in _LTO_FLAGS:
+        raise RuntimeError(
+            f"Invalid ck-lto value '{lto}', expected one of {', '.join(_LTO_FLAGS)}"
+        )
+    toolName = name.removesuffix("flags")
+    tool = target.tools.get(toolName)
+    if lto == "thin" and tool is not None and _isGcc(tool):
+        raise RuntimeError(
+            f"ck-lto=thin needs clang but the {toolName} tool is {tool.cmd}, use ck-lto=full instead"
+        )
+    # The prop replaces whatever LTO mode the tools asked for
+    return [f for f in var if not _isLtoFlag(f)] + _LTO_FLAGS[lto]
+
+
 def applyExtraProps(scope: TargetScope, name: str, var: list[str]) -> list[str]:
     target: model.Target = scope.target
+    var = _applyLto(target, name, var)
     extra = target.props.get(f"ck-{name}-extra", None)
     if extra:
-        var += extra.split(" ")
+        var = var + extra.split(" ")
     override = target.props.get(f"ck-{name}-override")
     if override:
         var = override.split(" ")
     return var
 
 
+_TOOL_DESCRIPTION = f"{vt100.BLUE}$ck_target{vt100.RESET}/{vt100.CYAN}$ck_component{vt100.RESET}: {vt100.YELLOW}{{tool}} {vt100.FAINT + vt100.WHITE}$out...{vt100.RESET}"
+
+
+def _ltoJobs() -> str:
+    # Share the make jobserver when there is one, otherwise use every
+    # core. It depends on the environment, so it is fingerprinted.
+    if "--jobserver-auth" in os.environ.get("MAKEFLAGS", ""):
+        return "jobserver"
+    return "auto"
+
+
+@functools.cache
+def _gccMajor(cmd: str) -> int:
+    # 0 when the version can't be told
+    try:
+        version = shell.popen(cmd, "-dumpversion")
+    except RuntimeError:
+        return 0
+    major = version.partition(".")[0]
+    return int(major) if major.isdecimal() else 0
+
+
+def _parallelLto(tool: model.Tool, flags: list[str]) -> list[str]:
+    """
+    A bare -flto makes GCC run the LTRANS phase on a single thread,
+    ask it to use every core (or the make jobserver) instead, this
+    needs GCC 10 or later.
+    """
+    if "-flto" not in flags:
+        return flags
+    if not _isGcc(tool):
+        return flags
+    if _gccMajor(tool.cmd) < 10:
+        return flags
+    lto = f"-flto={_ltoJobs()}"
+    return [lto if f == "-flto" else f for f in flags]
+
+
 def gen(out: TextIO, scope: TargetScope):
-    w = ninja.Writer(out)
+    buf = io.StringIO()
+    _gen(ninja.Writer(buf), scope)
+    out.write(buf.getvalue())
+
+
+def _gen(
+    w: ninja.Writer,
+    scope: TargetScope,
+    fragments: dict[str, io.StringIO] | None = None,
+):
+    from . import rules
+
     target: model.Target = scope.target
 
     w.comment("File generated by the build system, do not edit")
     w.newline()
 
     w.separator("Variables")
-    for name, compute in _vars.items():
+    for name, compute in _frozenVars():
         w.variable(name, applyExtraProps(scope, name, compute(scope)))
     w.newline()
 
     w.separator("Tools")
 
-    for i in target.tools:
-        tool = target.tools[i]
+    for i, tool in target.tools.items():
         rule = rules.rules[i]
+        flags = applyExtraProps(scope, i + "flags", rule.args + tool.args)
+        if i == "ld":
+            flags = _parallelLto(tool, flags)
         w.variable(i, tool.cmd)
-        w.variable(
-            i + "flags",
-            " ".join(applyExtraProps(scope, i + "flags", rule.args + tool.args)),
-        )
+        w.variable(i + "flags", " ".join(flags))
         w.rule(
             i,
             f"{tool.cmd} {(tool.rule or rule.rule).replace('$flags',f'${i}flags')}",
-            description=f"{vt100.BLUE}$ck_target{vt100.RESET}/{vt100.CYAN}$ck_component{vt100.RESET}: {vt100.YELLOW}{i} {vt100.FAINT + vt100.WHITE}$out...{vt100.RESET}",
+            description=_TOOL_DESCRIPTION.format(tool=i),
             depfile=rule.deps,
         )
         w.newline()
 
     w.separator("Build")
 
-    all(w, scope)
+    all(w, scope, fragments)
+
+
+# --- Compilation Database --------------------------------------------------- #
+
+_NINJA_VAR_RE = re.compile(r"\$(\$|[ :]|\{[\w.-]+\}|[\w-]+)")
+
+
+def _expandNinja(s: str, env: dict[str, str]) -> str:
+    def lookup(m: re.Match) -> str:
+        name = m.group(1)
+        if name in ("$", " ", ":"):
+            return name
+        return env.get(name.strip("{}"), "")
+
+    return _NINJA_VAR_RE.sub(lookup, s)
+
+
+class _CompdbWriter(ninja.Writer):
+    """
+    A ninja writer that also records what it writes, so the
+    compilation database can be built the same way `ninja -t compdb`
+    does without running ninja and parsing the file again.
+    """
+
+    def __init__(self, output: TextIO):
+        super().__init__(output)
+        self._env: dict[str, str] = {}
+        self._commands: dict[str, str] = {}
+        # (rule, outputs, inputs, implicit and order-only inputs, variables)
+        self._edges: list[tuple[str, list[str], list[str], list[str], dict]] = []
+
+    def variable(self, key: str, value: ninja.VarValue, indent: int = 0) -> None:
+        super().variable(key, value, indent)
+        if indent == 0 and value is not None:
+            if isinstance(value, list):
+                value = " ".join(filter(None, value))
+            self._env[key] = _expandNinja(str(value), self._env)
+
+    def rule(self, name: str, command: ninja.VarValue, *args, **kwargs) -> None:
+        super().rule(name, command, *args, **kwargs)
+        if isinstance(command, list):
+            command = " ".join(filter(None, command))
+        self._commands[name] = str(command)
+
+    def build(
+        self,
+        outputs: Union[str, list[str]],
+        rule: str,
+        inputs: ninja.VarPath,
+        implicit: ninja.VarPath = None,
+        order_only: ninja.VarPath = None,
+        variables: Union[dict[str, str], None] = None,
+        *args,
+        **kwargs,
+    ) -> list[str]:
+        outputs = super().build(
+            outputs, rule, inputs, implicit, order_only, variables, *args, **kwargs
+        )
+        self._edges.append(
+            (
+                rule,
+                outputs,
+                utils.asList(inputs),
+                utils.asList(implicit) + utils.asList(order_only),
+                variables or {},
+            )
+        )
+        return outputs
+
+    def sub(self, output: TextIO) -> "_CompdbWriter":
+        """
+        A writer for a subninja, recording into this one since
+        subninjas see the variables and rules of their parent.
+        """
+        w = _CompdbWriter(output)
+        w._env = self._env
+        w._commands = self._commands
+        w._edges = self._edges
+        return w
+
+    def compdb(self) -> list[dict[str, str]]:
+        directory = os.getcwd()
+        res: list[dict[str, str]] = []
+        for rule, outputs, inputs, deps, variables in self._edges:
+            if not inputs and not deps:
+                continue
+            env = self._env | {
+                k: _expandNinja(v, self._env) for k, v in variables.items()
+            }
+            env["in"] = " ".join(inputs)
+            env["out"] = " ".join(outputs)
+            res.append(
+                {
+                    "directory": directory,
+                    # phony edges have no command, ninja lists them anyway
+                    "command": _expandNinja(self._commands.get(rule, ""), env),
+                    "file": (inputs + deps)[0],
+                    "output": outputs[0],
+                }
+            )
+        return res
+
+
+def _subWriter(w: ninja.Writer, output: TextIO) -> ninja.Writer:
+    if isinstance(w, _CompdbWriter):
+        return w.sub(output)
+    return ninja.Writer(output)
 
 
 @hook("generate-global-aliases")
 def _globalHeaderHook(scope: TargetScope):
     generatedDir = Path(shell.mkdir(os.path.join(const.GENERATED_DIR, "__aliases__")))
+    existingAliases = set(os.listdir(generatedDir))
     for c in scope.registry.iter(model.Component):
-        if c.type != model.Kind.LIB:
+        if c.type != model.Kind.LIB or c.id in existingAliases:
             continue
 
-        modPath = shell.either(
-            [
-                os.path.join(c.dirname(), "_mod.h"),
-                os.path.join(c.dirname(), "mod.h"),
-            ]
-        )
+        try:
+            entries = os.listdir(c.dirname())
+        except FileNotFoundError:
+            continue
 
-        aliasPath = generatedDir / c.id
-        if modPath is None or os.path.exists(aliasPath):
+        if "_mod.h" in entries:
+            modName = "_mod.h"
+        elif "mod.h" in entries:
+            modName = "mod.h"
+        else:
             continue
 
-        targetPath = f"{c.id}/{os.path.basename(modPath)}"
+        aliasPath = generatedDir / c.id
+        targetPath = f"{c.id}/{modName}"
         print(f"Generating alias <{c.id}> -> <{targetPath}>")
         # We can't generate an alias using symlinks because
         # because this will break #pragma once in some compilers.
-        with open(aliasPath, "w") as f:
+        tmpPath = aliasPath.with_name(aliasPath.name + ".tmp")
+        with open(tmpPath, "w") as f:
             f.write("#pragma once\n")
-            f.write(f"#include <{c.id}/{os.path.basename(modPath)}>\n")
+            f.write(f"#include <{targetPath}>\n")
+        os.replace(tmpPath, aliasPath)
+
+
+def _resetCaches():
+    """
+    Forget every directory listing and everything derived from them.
+    The caches only hold for one build, files may have been added or
+    removed (by a hook for example) by the time the next one starts.
+    """
+    _listdirCache.clear()
+    _resTreeCache.clear()
+    _subdirsCache.clear()
+    _componentScopes.clear()
+    _objsCache.clear()
+    _outfileCache.clear()
+    _libsCache.clear()
+    for cache in _varCaches:
+        cache.clear()
+
+
+def _fingerprint(scope: TargetScope) -> str:
+    """
+    Hash everything build.ninja is generated from, so we can tell
+    when the existing file is still up to date.
+    """
+    from . import rules
+
+    parts: list[str] = [
+        const.VERSION_STR,
+        scope.target.hashid,
+        _ltoJobs(),
+        *sorted(k for k, _ in _frozenHooks()),
+    ]
+
+    # Plugins can define their own variables, hash their values
+    for name, compute in _frozenVars():
+        parts.append(f"{name}={compute(scope)}")
+
+    # They can also edit the rules table
+    for r in rules.rules.values():
+        parts.append(f"{r.id}:{r.fileIn}:{r.rule}:{r.args}:{r.deps}")
+
+    for m in scope.registry.manifests.values():
+        if m.path:
+            st = os.stat(m.path)
+            parts.append(f"{m.path}:{st.st_mtime_ns}:{st.st_size}")
+
+    # Adding or removing a source or resource changes the mtime of its
+    # directory, editing one is already tracked by ninja.
+    dirs: list[str] = []
+    for c in scope.registry.iterEnabled(scope.target):
+        dirs += _componentScope(scope, c).subdirs()
+        dirs += _resTree(c)[0]
+    for d in dirs:
+        try:
+            parts.append(f"{d}:{os.stat(d).st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{d}:-")
+
+    return utils.hash(parts)
+
+
+def _readStamp(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _writeIfChanged(path: str, data: str) -> bool:
+    # Leave the file, and its mtime, alone when nothing changed, and
+    # never let ninja see a half written file.
+    try:
+        with open(path) as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "w") as f:
+        f.write(data)
+    os.replace(tmpPath, path)
+    return True
 
 
 def build(
@@ -416,12 +1055,45 @@ def build(
     components: Union[list[model.Component], model.Component, Literal["all"]] = "all",
     generateCompilationDb=False,
 ) -> list[ProductScope]:
+    _resetCaches()
+    return _build(scope, components, generateCompilationDb)
+
+
+def _build(
+    scope: TargetScope,
+    components: Union[list[model.Component], model.Component, Literal["all"]] = "all",
+    generateCompilationDb=False,
+) -> list[ProductScope]:
+    # Same as build(), reusing what the previous builds already listed
     all = False
     shell.mkdir(scope.target.builddir)
     ninjaPath = os.path.join(scope.target.builddir, "build.ninja")
-
-    with open(ninjaPath, "w") as f:
-        gen(f, scope)
+    stampPath = ninjaPath + ".stamp"
+
+    fingerprint = _fingerprint(scope)
+    upToDate = os.path.exists(ninjaPath) and _readStamp(stampPath) == fingerprint
+
+    # The writer emits many small strings, assemble the file in
+    # memory and write it out in one go.
+    buf = io.StringIO()
+    w = _CompdbWriter(buf)
+    fragments: dict[str, io.StringIO] = {}
+    if not upToDate or generateCompilationDb:
+        _gen(w, scope, fragments)
+
+    if not upToDate:
+        # Drop the stamp first so a failed generation is never
+        # mistaken for an up to date build.ninja.
+        if os.path.exists(stampPath):
+            os.remove(stampPath)
+        for path, fragment in fragments.items():
+            shell.mkdir(os.path.dirname(path))
+            _writeIfChanged(path, fragment.getvalue())
+        _writeIfChanged(ninjaPath, buf.getvalue())
+        with open(stampPath, "w") as f:
+            f.write(fingerprint)
+    else:
+        _logger.info(f"{ninjaPath} is up to date")
 
     if components == "all":
         all = True
@@ -430,27 +1102,34 @@ def build(
     if isinstance(components, model.Component):
         components = [components]
 
-    for k, v in _hooks.items():
-        print(f"Running hook '{k}'")
-        v(scope)
+    # Hooks write to shared locations such as the generated directory,
+    # never run them concurrently when targets are built in parallel.
+    with _hooksLock:
+        for k, v in _frozenHooks():
+            key = (k, scope.key())
+            if key in _ranHooks:
+                continue
+            print(f"Running hook '{k}'")
+            v(scope)
+            _ranHooks.add(key)
 
     products: list[ProductScope] = []
     for c in components:
-        s = scope.openComponentScope(c)
+        s = _componentScope(scope, c)
         r = c.resolved[scope.target.id]
         if not r.enabled:
             raise RuntimeError(f"Component {c.id} is disabled: {r.reason}")
 
-        products.append(s.openProductScope(Path(outfile(scope.openComponentScope(c)))))
+        products.append(s.openProductScope(Path(outfile(s))))
 
     outs = list(map(lambda p: str(p.path), products))
 
     ninjaCmd = ["ninja", "-f", ninjaPath, *(outs if not all else [])]
 
     if generateCompilationDb:
-        database = shell.popen(*ninjaCmd, "-t", "compdb")
         with open("compile_commands.json", "w") as f:
-            f.write(database)
+            json.dump(w.compdb(), f, indent=2, ensure_ascii=False)
+            f.write("\n")
     else:
         shell.exec(*ninjaCmd)
 
@@ -475,19 +1154,48 @@ class BuildArgs(model.TargetArgs):
     )
 
 
+class BuildCmdArgs(BuildArgs):
+    # Only for builder/build, run and friends build a single target
+    jobs: int = cli.arg(
+        "j",
+        "jobs",
+        "Number of targets to build in parallel, requires --universe",
+        default=1,
+    )
+
+
 @cli.command("b", "builder/build", "Build a component or all components")
-def _(args: BuildArgs):
+def _(args: BuildCmdArgs):
+    if args.jobs < 1:
+        raise RuntimeError(f"--jobs must be at least 1, got {args.jobs}")
+    # ninja already picks its own parallelism for a single target
+    if args.jobs != 1 and not args.universe:
+        raise RuntimeError("--jobs can only be used with --universe")
+
     if args.universe:
         registry = model.Registry.use(args)
-        for target in registry.iter(model.Target):
+
+        def buildTarget(target: model.Target):
             scope = TargetScope(registry, target)
             component = None
             if args.component is not None:
                 component = scope.registry.lookup(args.component, model.Component)
-            build(
+            _build(
                 scope,
                 component if component is not None else "all",
             )[0]
+
+        # Targets share their source directories, list them once for all
+        _resetCaches()
+        targets = list(registry.iter(model.Target))
+        if args.jobs > 1:
+            # Targets have their own build directory and ninja file,
+            # so they can be built side by side.
+            with ThreadPoolExecutor(args.jobs) as executor:
+                list(executor.map(buildTarget, targets))
+        else:
+            for target in targets:
+                buildTarget(target)
     else:
         scope = TargetScope.use(args)
         component = None
@@ -520,8 +1228,7 @@ def runCmd(args: RunArgs):
 
     scope = TargetScope.use(args)
 
-    if args.component in scope.target.routing:
-        args.component = scope.target.routing[args.component]
+    args.component = scope.target.route(args.component)
 
     component = scope.registry.lookup(
         args.component, model.Component, includeProvides=True
@@ -567,16 +1274,20 @@ def _(args: RunArgs):
 def _():
     model.Project.use()
     shell.rmrf(const.BUILD_DIR)
+    _forgetHooks()
 
 
 @cli.command("n", "builder/nuke", "Clean all build files and caches")
 def _():
     model.Project.use()
     shell.rmrf(const.PROJECT_CK_DIR)
+    _forgetHooks()
 
 
 @cli.command("m", "builder/mixins", "List all available mixins")
 def _():
+    from . import mixins
+
     vt100.title("Mixins")
     print(vt100.indent(vt100.wordwrap(", ".join(mixins.mixins.keys()))))
     print()
@@ -1,5 +1,9 @@
 from enum import Enum
 import os
+import importlib
+import functools
+import re
+import shlex
 import sys
 from types import GenericAlias
 import typing as tp
@@ -19,6 +23,8 @@ class Scan:
     A simple scanner for parsing command-line arguments.
     """
 
+    __slots__ = ("_src", "_off", "_save")
+
     _src: str
     _off: int
     _save: list[int]
@@ -42,9 +48,10 @@ class Scan:
         Returns:
             The current character, or '\0' if at the end of the string.
         """
-        if self.eof():
+        off = self._off
+        if off >= len(self._src):
             return "\0"
-        return self._src[self._off]
+        return self._src[off]
 
     def next(self) -> str:
         """
@@ -53,11 +60,14 @@ class Scan:
         Returns:
             The new current character, or '\0' if at the end of the string.
         """
-        if self.eof():
+        src = self._src
+        off = self._off
+        if off >= len(src):
             return "\0"
 
-        self._off += 1
-        return self.curr()
+        off += 1
+        self._off = off
+        return src[off] if off < len(src) else "\0"
 
     def peek(self, off: int = 1) -> str:
         """
@@ -132,11 +142,13 @@ class Scan:
         Returns:
             True if any whitespace was skipped, False otherwise.
         """
-        result = False
-        while not self.eof() and self.curr().isspace():
-            self.next()
-            result = True
-        return result
+        src = self._src
+        off = start = self._off
+        end = len(src)
+        while off < end and src[off].isspace():
+            off += 1
+        self._off = off
+        return off != start
 
     def skipSeparator(self, sep: str) -> bool:
         """
@@ -225,7 +237,7 @@ List = list[PrimitiveValue]
 Value = str | bool | int | Object | List
 
 
-@dt.dataclass
+@dt.dataclass(frozen=True, slots=True)
 class Token:
     """
     Base class for command-line argument tokens.
@@ -234,7 +246,7 @@ class Token:
     pass
 
 
-@dt.dataclass
+@dt.dataclass(frozen=True, slots=True)
 class ArgumentToken(Token):
     """
     Represents a command-line argument token.
@@ -252,7 +264,7 @@ class ArgumentToken(Token):
     short: bool
 
 
-@dt.dataclass
+@dt.dataclass(frozen=True, slots=True)
 class OperandToken(Token):
     """
     Represents a command-line operand token.
@@ -264,7 +276,7 @@ class OperandToken(Token):
     value: str
 
 
-@dt.dataclass
+@dt.dataclass(frozen=True, slots=True)
 class ExtraToken(Token):
     """
     Represents extra command-line arguments after a "--" separator.
@@ -276,30 +288,24 @@ class ExtraToken(Token):
     args: list[str]
 
 
-def _parseIdent(s: Scan) -> str:
-    """Parses an identifier from the scanner."""
-    res = ""
-    while not s.eof() and (s.curr().isalnum() or s.curr() in "_-+"):
-        res += s.curr()
-        s.next()
-    return res
-
-
 def _parseUntilComma(s: Scan) -> str:
     """Parses a string until a comma is encountered."""
-    res = ""
-    while not s.eof() and s.curr() != ",":
-        res += s.curr()
-        s.next()
+    end = s._src.find(",", s._off)
+    if end < 0:
+        end = len(s._src)
+    res = s._src[s._off : end]
+    s._off = end
     return res
 
 
-def _expectIdent(s: Scan) -> str:
-    """Parses an identifier and raises an error if not found."""
-    res = _parseIdent(s)
-    if len(res) == 0:
+_IDENT_RE = re.compile(r"[\w+-]+")
+
+
+def _checkIdent(ident: str) -> str:
+    """Raises an error if the string is not an identifier."""
+    if not _IDENT_RE.fullmatch(ident):
         raise RuntimeError("Expected identifier")
-    return res
+    return ident
 
 
 def _parseString(s: Scan, quote: str) -> str:
@@ -326,12 +332,33 @@ def _parseString(s: Scan, quote: str) -> str:
 
 def _tryParseInt(ident) -> Optional[int]:
     """Tries to parse an integer, returning None if unsuccessful."""
+    # Only call int() on strings that can be numbers, most values are
+    # plain words and raising ValueError for them is not cheap.
+    digits = ident.strip().lstrip("+-").replace("_", "")
+    if not digits.isdecimal():
+        return None
     try:
         return int(ident)
     except ValueError:
         return None
 
 
+_BOOL_LITERALS: dict[str, bool] = {
+    "true": True,
+    "True": True,
+    "y": True,
+    "yes": True,
+    "Y": True,
+    "Yes": True,
+    "false": False,
+    "False": False,
+    "n": False,
+    "no": False,
+    "N": False,
+    "No": False,
+}
+
+
 def _parsePrimitive(s: Scan) -> PrimitiveValue:
     """Parses a primitive value from the scanner."""
     if s.curr() == '"':
@@ -341,10 +368,9 @@ def _parsePrimitive(s: Scan) -> PrimitiveValue:
     else:
         ident = _parseUntilComma(s)
 
-        if ident in ("true", "True", "y", "yes", "Y", "Yes"):
-            return True
-        elif ident in ("false", "False", "n", "no", "N", "No"):
-            return False
+        b = _BOOL_LITERALS.get(ident)
+        if b is not None:
+            return b
         elif n := _tryParseInt(ident):
             return n
         else:
@@ -367,39 +393,42 @@ def parseValue(s: str) -> Value:
     return _parseValue(Scan(s))
 
 
-def parseArg(arg: str) -> list[Token]:
-    """Parses a single command-line argument into a list of tokens."""
-    s = Scan(arg)
-    if s.skipStr("--"):
-        key = _expectIdent(s)
-        subkey = ""
-        if s.skipStr(":"):
-            subkey = _expectIdent(s)
-        if s.skipStr("="):
-            value = _parseValue(s)
-        else:
-            value = True
-        return [ArgumentToken(key, subkey, value, False)]
-    elif s.skipStr("-"):
-        res = []
-        while not s.eof():
-            key = s.curr()
-            if not key.isalnum():
-                raise RuntimeError("Expected alphanumeric")
-            s.next()
-            res.append(ArgumentToken(key, None, True, True))
-        return tp.cast(list[Token], res)
-    else:
-        return [OperandToken(arg)]
+@functools.lru_cache(maxsize=1024)
+def parseArg(arg: str) -> tuple[Token, ...]:
+    """
+    Parses a single command-line argument into a tuple of tokens.
+
+    Results are cached, the tokens are frozen and must be treated as
+    read-only, including list values.
+    """
+    if arg.startswith("--"):
+        name, eq, raw = arg[2:].partition("=")
+        key, colon, subkey = name.partition(":")
+        _checkIdent(key)
+        if colon:
+            _checkIdent(subkey)
+        value: Value = parseValue(raw) if eq else True
+        # Interned keys compare by identity against the field names
+        # they are looked up with.
+        return (ArgumentToken(sys.intern(key), sys.intern(subkey), value, False),)
+
+    if not arg.startswith("-"):
+        return (OperandToken(arg),)
+
+    res: list[Token] = []
+    for key in arg[1:]:
+        if not key.isalnum():
+            raise RuntimeError("Expected alphanumeric")
+        res.append(ArgumentToken(key, None, True, True))
+    return tuple(res)
 
 
 def parseArgs(args: list[str]) -> list[Token]:
     """Parses a list of command-line arguments into a list of tokens."""
     res: list[Token] = []
-    while len(args) > 0:
-        arg = args.pop(0)
+    for i, arg in enumerate(args):
         if arg == "--":
-            res.append(ExtraToken(args))
+            res.append(ExtraToken(args[i + 1 :]))
             break
         else:
             res.extend(parseArg(arg))
@@ -419,7 +448,7 @@ class FieldKind(Enum):
     EXTRA = 2
 
 
-@dt.dataclass
+@dt.dataclass(slots=True)
 class Field:
     """
     Represents a field in a command-line argument schema.
@@ -434,12 +463,34 @@ class Field:
     _fieldName: str | None = dt.field(init=False, default=None)
     _fieldType: type | None = dt.field(init=False, default=None)
 
+    # Derived from the field type by bind(), they are read on every
+    # parsed value.
+    _isList: bool = dt.field(init=False, default=False)
+    _isDict: bool = dt.field(init=False, default=False)
+    _isUnion: bool = dt.field(init=False, default=False)
+    _innerType: type | None = dt.field(init=False, default=None)
+
     def bind(self, typ: type, name: str):
         """Binds the field to a specific type and field name."""
         self._fieldName = name
-        self._fieldType = typ.__annotations__[name]
-        if self.longName is None:
-            self.longName = name
+        self._fieldType = t = typ.__annotations__[name]
+        self.longName = sys.intern(name if self.longName is None else self.longName)
+
+        self._isList = isinstance(t, GenericAlias) and t.__origin__ is list
+        self._isDict = isinstance(t, GenericAlias) and t.__origin__ is dict
+        self._isUnion = (
+            isinstance(t, tp._SpecialForm)
+            and getattr(t, "__origin__", None) is tp.Union
+        )
+
+        if self._isList:
+            self._innerType = t.__args__[0]
+        elif self._isDict:
+            self._innerType = t.__args__[1]
+        elif self._isUnion:
+            self._innerType = str
+        else:
+            self._innerType = t
 
     def isBool(self) -> bool:
         """Checks if the field is a boolean."""
@@ -447,41 +498,20 @@ class Field:
 
     def isList(self) -> bool:
         """Checks if the field is a list."""
-        return (
-            isinstance(self._fieldType, GenericAlias)
-            and self._fieldType.__origin__ is list
-        )
+        return self._isList
 
     def isDict(self) -> bool:
         """Checks if the field is a dictionary."""
-        return (
-            isinstance(self._fieldType, GenericAlias)
-            and self._fieldType.__origin__ is dict
-        )
+        return self._isDict
 
     def isUnion(self) -> bool:
         """Checks if the field is a union type."""
-        return (
-            isinstance(self._fieldType, tp._SpecialForm)
-            and self._fieldType.__origin__ is tp.Union
-        )
+        return self._isUnion
 
     def innerType(self) -> type:
         """Returns the inner type of the field (e.g., the type of elements in a list)."""
-        assert self._fieldType
-
-        if self.isList():
-            assert isinstance(self._fieldType, GenericAlias)
-            return self._fieldType.__args__[0]
-
-        if self.isDict():
-            assert isinstance(self._fieldType, GenericAlias)
-            return self._fieldType.__args__[1]
-
-        if self.isUnion():
-            return str
-
-        return self._fieldType
+        assert self._innerType
+        return self._innerType
 
     def defaultValue(self) -> Any:
         """Returns the default value for the field."""
@@ -551,6 +581,14 @@ class Field:
         assert self._fieldName
         return getattr(obj, self._fieldName)
 
+    def flag(self) -> str:
+        """Returns the flag spelling of the field, e.g. `-v, --verbose`."""
+        if self.shortName and self.longName:
+            return f"-{self.shortName}, --{self.longName}"
+        if self.shortName:
+            return f"-{self.shortName}"
+        return f"--{self.longName}"
+
 
 def arg(
     shortName: str | None = None,
@@ -593,6 +631,10 @@ def extra(longName: str = "", description: str = "") -> Any:
     return Field(FieldKind.EXTRA, None, longName, description)
 
 
+# Schemas already extracted, keyed by type
+_schemaCache: dict[type, "Schema"] = {}
+
+
 class HelpRequested(Exception):
     pass
 
@@ -601,7 +643,7 @@ class UsageRequested(Exception):
     pass
 
 
-@dt.dataclass
+@dt.dataclass(slots=True)
 class Schema:
     """
     Represents a command-line argument schema.
@@ -612,44 +654,63 @@ class Schema:
     operands: list[Field] = dt.field(default_factory=list)
     extras: Optional[Field] = None
 
+    _byShort: Optional[dict[str, Field]] = dt.field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _byLong: Optional[dict[str, Field]] = dt.field(
+        init=False, default=None, repr=False, compare=False
+    )
+
     @staticmethod
     def extract(typ: type) -> "Schema":
-        """Extracts a command-line argument schema from a type."""
+        """
+        Extracts a command-line argument schema from a type.
+
+        Schemas are cached per type, each call gets its own copy of
+        the field lists.
+        """
+        s = _schemaCache.get(typ)
+        if s is None:
+            s = _schemaCache[typ] = Schema._extract(typ)
+        return dt.replace(s, args=list(s.args), operands=list(s.operands))
+
+    @staticmethod
+    def _extract(typ: type) -> "Schema":
+        """Extracts a command-line argument schema from a type, uncached."""
         s = Schema(typ)
+        seen: set[str] = set()
 
-        for f in typ.__annotations__.keys():
-            field = getattr(typ, f, None)
+        # walk the mro so diamond bases are only visited once, fields
+        # redefined in a subclass shadow the ones from its bases
+        for cls in typ.__mro__:
+            if cls is object:
+                continue
 
-            if field is None:
-                raise ValueError(f"Field '{f}' is not defined")
+            for f in cls.__annotations__.keys():
+                if f in seen:
+                    continue
+                seen.add(f)
 
-            if not isinstance(field, Field):
-                raise ValueError(f"Field '{f}' is not a Field")
+                field = getattr(cls, f, None)
 
-            field.bind(typ, f)
+                if field is None:
+                    raise ValueError(f"Field '{f}' is not defined")
 
-            if field.kind == FieldKind.FLAG:
-                s.args.append(field)
-            elif field.kind == FieldKind.OPERAND:
-                s.operands.append(field)
-            elif field.kind == FieldKind.EXTRA:
-                if s.extras:
-                    raise ValueError("Only one extra argument is allowed")
-                s.extras = field
+                if not isinstance(field, Field):
+                    raise ValueError(f"Field '{f}' is not a Field")
 
-        # now move to the base class
-        for base in typ.__bases__:
-            if base is object:
-                continue
-            baseSchema = Schema.extract(base)
-            s.args.extend(baseSchema.args)
-            s.operands.extend(baseSchema.operands)
-            if not s.extras:
-                s.extras = baseSchema.extras
-            elif baseSchema.extras:
-                raise ValueError("Only one extra argument is allowed")
+                field.bind(cls, f)
+
+                if field.kind == FieldKind.FLAG:
+                    s.args.append(field)
+                elif field.kind == FieldKind.OPERAND:
+                    s.operands.append(field)
+                elif field.kind == FieldKind.EXTRA:
+                    if s.extras:
+                        raise ValueError("Only one extra argument is allowed")
+                    s.extras = field
 
-        s.args = sorted(s.args, key=lambda f: f.longName)
+        s.args.sort(key=lambda f: f.longName)
 
         return s
 
@@ -669,31 +730,27 @@ class Schema:
 
     def usage(self) -> str:
         """Returns a usage string for the schema."""
-        res = ""
-        for arg in self.args:
-            flag = ""
-            if arg.shortName:
-                flag += f"-{arg.shortName}"
-
-            if arg.longName:
-                if flag:
-                    flag += ", "
-                flag += f"--{arg.longName}"
-            res += f"[{flag}] "
-        for operand in self.operands:
-            res += f"<{operand.longName}> "
+        parts = [f"[{arg.flag()}] " for arg in self.args]
+        parts.extend(f"<{operand.longName}> " for operand in self.operands)
         if self.extras:
-            res += f"[-- {self.extras.longName}]"
-        return res
+            parts.append(f"[-- {self.extras.longName}]")
+        return "".join(parts)
 
     def _lookupArg(self, key: str, short: bool) -> Field:
         """Looks up an argument field by key and short flag."""
-        for arg in self.args:
-            if short and arg.shortName == key:
-                return arg
-            elif not short and arg.longName == key:
-                return arg
-        raise ValueError(f"Unknown argument '{key}'")
+        if self._byShort is None or self._byLong is None:
+            # Built on first use, the first field wins like a linear scan would
+            self._byShort = {}
+            self._byLong = {}
+            for a in self.args:
+                if a.shortName:
+                    self._byShort.setdefault(a.shortName, a)
+                self._byLong.setdefault(a.longName, a)
+
+        arg = (self._byShort if short else self._byLong).get(key)
+        if arg is None:
+            raise ValueError(f"Unknown argument '{key}'")
+        return arg
 
     def _setOperand(self, obj: Any, value: Any):
         """Sets the value of the next available operand field on the given object."""
@@ -734,17 +791,18 @@ class Schema:
             else:
                 return None
 
-        stack = args[:]
-        while len(stack) > 0:
-            if stack[0] == "--":
+        # Walk the arguments by index, short flags may consume the next one
+        i = 0
+        while i < len(args):
+            if args[i] == "--":
                 if not self.extras:
                     raise ValueError("Unexpected '--'")
-                self.extras.putValue(res, stack[1:])
+                self.extras.putValue(res, args[i + 1 :])
                 break
 
-            toks = parseArg(stack.pop(0))
-            while len(toks) > 0:
-                tok = toks.pop(0)
+            toks = parseArg(args[i])
+            i += 1
+            for tok in toks:
                 if isinstance(tok, ArgumentToken):
                     if tok.key == "h" or tok.key == "help":
                         raise HelpRequested()
@@ -754,12 +812,13 @@ class Schema:
 
                     arg = self._lookupArg(tok.key, tok.short)
                     if tok.short and not arg.isBool():
-                        if len(stack) == 0:
+                        if i >= len(args):
                             raise ValueError(
                                 f"Expected value for argument '-{arg.shortName}'"
                             )
 
-                        arg.putValue(res, parseValue(stack.pop(0)))
+                        arg.putValue(res, parseValue(args[i]))
+                        i += 1
                     else:
                         arg.putValue(res, tok.value, tok.subkey)
                 elif isinstance(tok, OperandToken):
@@ -770,7 +829,7 @@ class Schema:
         return res
 
 
-@dt.dataclass
+@dt.dataclass(slots=True)
 class Command:
     """
     Represents a command in the command-line interface.
@@ -781,30 +840,40 @@ class Command:
     description: str = ""
     epilog: Optional[str] = None
 
-    schema: Optional[Schema] = None
+    _schema: Optional[Schema] = None
     callable: Optional[tp.Callable] = None
     subcommands: dict[str, "Command"] = dt.field(default_factory=dict)
     populated: bool = False
+    _subByShort: dict[str, "Command"] = dt.field(default_factory=dict, repr=False)
 
     @property
     def longName(self) -> str:
         """Returns the long name of the command."""
         return self.path[-1]
 
+    @property
+    def schema(self) -> Optional[Schema]:
+        """Returns the argument schema of the command, extracting it on first use."""
+        if self._schema is None and self.callable is not None:
+            self._schema = Schema.extractFromCallable(self.callable)
+        return self._schema
+
     def _spliceArgs(self, args: list[str]) -> tuple[list[str], list[str]]:
         """Splices the argument list into arguments for the current command and arguments for subcommands."""
-        rest = args[:]
-        curr = []
-        if len(self.subcommands) > 0:
-            while len(rest) > 0 and rest[0].startswith("-") and rest[0] != "--":
-                curr.append(rest.pop(0))
-        else:
-            curr = rest
-            rest = []
-        return curr, rest
+        if not self.subcommands:
+            return args, []
+
+        i = 0
+        for arg in args:
+            if arg == "--" or not arg.startswith("-"):
+                break
+            i += 1
+        return args[:i], args[i:]
 
     def help(self):
         """Prints the help message for the command."""
+        _loadLazy()
+
         vt100.title(f"{self.longName}")
         print()
 
@@ -818,20 +887,13 @@ class Command:
 
         if self.schema and any(self.schema.args):
             vt100.subtitle("Options")
+            lines = []
             for arg in self.schema.args:
-                flag = ""
-                if arg.shortName:
-                    flag += f"-{arg.shortName}"
-
-                if arg.longName:
-                    if flag:
-                        flag += ", "
-                    flag += f"--{arg.longName}"
-
                 if arg.description:
-                    flag += f" {arg.description}"
-
-                print(vt100.indent(flag))
+                    lines.append(vt100.indent(f"{arg.flag()} {arg.description}"))
+                else:
+                    lines.append(vt100.indent(arg.flag()))
+            print("\n".join(lines))
             print()
 
         if any(self.subcommands):
@@ -850,36 +912,40 @@ class Command:
 
     def usage(self) -> str:
         """Returns a usage string for the command."""
-        res = " "
+        _loadLazy()
+
+        parts = [" "]
         if self.schema:
-            res += self.schema.usage()
+            parts.append(self.schema.usage())
 
         if len(self.subcommands) == 1:
-            res += "[subcommand] [args...]"
+            parts.append("[subcommand] [args...]")
 
         elif len(self.subcommands) > 0:
-            res += "{"
-            first = True
-            for name, cmd in self.subcommands.items():
-                if not first:
-                    res += "|"
-                res += f"{name}"
-                first = False
-            res += "}"
+            parts.append(f"{{{'|'.join(self.subcommands)}}} [args...]")
 
-            res += " [args...]"
-
-        return res
+        return "".join(parts)
 
     def lookupSubcommand(self, name: str) -> "Command":
         """Looks up a subcommand by name."""
-        if name in self.subcommands:
-            return self.subcommands[name]
-        for sub in self.subcommands.values():
-            if sub.shortName == name:
-                return sub
+        sub = self._lookupLoaded(name)
+        if sub is None or not sub.populated:
+            # Only import the lazy modules when the commands already
+            # registered can't answer, short names included.
+            _loadLazy()
+            sub = self._lookupLoaded(name)
+
+        if sub is not None:
+            return sub
         raise ValueError(f"Unknown subcommand '{name}'")
 
+    def _lookupLoaded(self, name: str) -> Optional["Command"]:
+        """Looks up a registered subcommand by long name, then by short name."""
+        sub = self.subcommands.get(name)
+        if sub is None:
+            sub = self._subByShort.get(name)
+        return sub
+
     def invoke(self, argv: list[str]):
         """Invokes the command with the given arguments."""
         if self.callable:
@@ -891,8 +957,8 @@ class Command:
 
     def eval(self, args: list[str]):
         """Evaluates the command and its subcommands based on the given arguments."""
-        cmd = args.pop(0)
-        curr, rest = self._spliceArgs(args)
+        cmd = args[0]
+        curr, rest = self._spliceArgs(args[1:])
 
         try:
             self.invoke(curr)
@@ -938,6 +1004,40 @@ class Command:
 
 
 _root = Command(None, [const.ARGV0])
+# Lazy modules with the position their root commands should take
+_lazy: list[tuple[str, int]] = []
+
+
+def lazy(*modules: str):
+    """
+    Registers modules that define commands but should only be imported
+    once one of their commands is looked up or the help is displayed.
+
+    Their root commands are listed where they would have been if the
+    modules were imported at the time `lazy()` is called.
+
+    Args:
+        modules: The fully qualified names of the modules.
+    """
+    _lazy.extend((m, len(_root.subcommands)) for m in modules)
+
+
+def _loadLazy():
+    """Imports all the modules registered with `lazy()`."""
+    while len(_lazy) > 0:
+        module, pos = _lazy.pop(0)
+        _logger.debug(f"Loading commands from '{module}'")
+        before = list(_root.subcommands)
+        importlib.import_module(module)
+
+        added = [k for k in _root.subcommands if k not in before]
+        if not added:
+            continue
+        order = before[:pos] + added + before[pos:]
+        subcommands = {k: _root.subcommands[k] for k in order}
+        _root.subcommands.clear()
+        _root.subcommands.update(subcommands)
+        _lazy[:] = [(m, p + len(added) if p >= pos else p) for m, p in _lazy]
 
 
 def _splitPath(path: str) -> list[str]:
@@ -955,9 +1055,10 @@ def _resolvePath(path: list[str]) -> Command:
     visited = []
     for name in path:
         visited.append(name)
-        if name not in cmd.subcommands:
-            cmd.subcommands[name] = Command(None, visited)
-        cmd = cmd.subcommands[name]
+        sub = cmd.subcommands.get(name)
+        if sub is None:
+            sub = cmd.subcommands[name] = Command(None, visited)
+        cmd = sub
     return cmd
 
 
@@ -972,20 +1073,21 @@ def command(shortName: Optional[str], longName: str, description: str = "") -> C
     """
 
     def wrap(fn: Callable):
-        schema = Schema.extractFromCallable(fn)
         path = _splitPath(longName)
         cmd = _resolvePath(path)
 
-        _logger.info(f"Registering command '{'.'.join(path)}'")
+        _logger.debug(f"Registering command '{'.'.join(path)}'")
         if cmd.populated:
             raise ValueError(f"Command '{longName}' is already defined")
 
         cmd.shortName = shortName
         cmd.description = description
-        cmd.schema = schema
         cmd.callable = fn
         cmd.populated = True
         cmd.path = [const.ARGV0] + path
+        if path and shortName:
+            # The first command registered with a short name keeps it
+            _resolvePath(path[:-1])._subByShort.setdefault(shortName, cmd)
         return fn
 
     return wrap
@@ -996,11 +1098,19 @@ def usage():
     print(f"Usage: {const.ARGV0} {_root.usage()}")
 
 
+@functools.cache
+def _extraArgs() -> tuple[str, ...]:
+    """Returns the arguments from `CK_EXTRA_ARGS`, tokenized once per process."""
+    return tuple(shlex.split(os.environ.get("CK_EXTRA_ARGS", "")))
+
+
 def exec():
     """Executes the command-line interface."""
-    extra = os.environ.get("CK_EXTRA_ARGS", None)
-    args = [const.ARGV0] + (extra.split(" ") if extra else []) + sys.argv[1:]
-    _root.eval(args)
+    try:
+        extra = _extraArgs()
+    except ValueError as e:
+        raise RuntimeError(f"Invalid CK_EXTRA_ARGS: {e}") from e
+    _root.eval([const.ARGV0, *extra, *sys.argv[1:]])
 
 
 def defaults(typ: type[utils.T]) -> utils.T:
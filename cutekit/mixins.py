@@ -93,6 +93,7 @@ def append(mixinSpec: str, mixin: Mixin):
 
 
 def byId(id: str) -> Mixin:
-    if id not in mixins:
+    mixin = mixins.get(id)
+    if mixin is None:
         raise RuntimeError(f"Unknown mixin {id}")
-    return mixins[id]
+    return mixin
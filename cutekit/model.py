@@ -6,7 +6,7 @@ import dataclasses as dt
 from enum import Enum
 from typing import Any, Generator, Optional, Type, cast
 from pathlib import Path
-from dataclasses_json import DataClassJsonMixin
+from dataclasses_json import DataClassJsonMixin, config
 
 from cutekit import const, shell
 
@@ -70,6 +70,13 @@ class Manifest(DataClassJsonMixin):
     """Type of the manifest."""
     path: str = dt.field(default="")
     """Path to the manifest file."""
+    _dirname: Optional[tuple[str, str]] = dt.field(
+        default=None,
+        repr=False,
+        compare=False,
+        metadata=config(exclude=lambda _: True),
+    )
+    """Cached directory of the manifest, with the working directory it is relative to, never serialized."""
 
     SUFFIXES = [".json", ".toml"]
     """Supported file extensions for manifest files."""
@@ -144,7 +151,10 @@ class Manifest(DataClassJsonMixin):
         Returns:
             The directory of the manifest.
         """
-        return os.path.relpath(os.path.dirname(self.path), Path.cwd())
+        cwd = os.getcwd()
+        if self._dirname is None or self._dirname[0] != cwd:
+            self._dirname = (cwd, os.path.relpath(os.path.dirname(self.path), cwd))
+        return self._dirname[1]
 
     def subpath(self, path) -> Path:
         """
@@ -309,6 +319,9 @@ class Extern(DataClassJsonMixin):
             return self._fetchLibrary()
 
 
+TOPMOST_CACHE: dict[Path, Optional["Project"]] = {}
+
+
 @dt.dataclass
 class Project(Manifest):
     """
@@ -337,16 +350,24 @@ class Project(Manifest):
         """
         Find the topmost project in the current directory hierarchy.
 
+        The result is cached per working directory, since the logger, the
+        plugin loader and most commands all look it up during a single run.
+
         Returns:
             The topmost Project object, or None if no project was found.
         """
-        cwd = Path.cwd()
+        start = Path.cwd()
+        if start in TOPMOST_CACHE:
+            return TOPMOST_CACHE[start]
+
+        cwd = start
         topmost: Optional["Project"] = None
         while str(cwd) != cwd.anchor:
             projectManifest = Manifest.tryLoad(cwd / "project")
             if projectManifest is not None:
                 topmost = projectManifest.ensureType(Project)
             cwd = cwd.parent
+        TOPMOST_CACHE[start] = topmost
         return topmost
 
     @staticmethod
@@ -548,11 +569,7 @@ class Target(Manifest):
         Returns:
             The routed component spec.
         """
-        return (
-            self.routing[componentSpec]
-            if componentSpec in self.routing
-            else componentSpec
-        )
+        return self.routing.get(componentSpec, componentSpec)
 
 
 # --- Component -------------------------------------------------------------- #
@@ -675,9 +692,7 @@ class Resolver:
 
         for c in self._registry.iter(Component):
             for p in c.provides + [c.id]:
-                if p not in self._mappings and [0]:
-                    self._mappings[p] = []
-                self._mappings[p].append(c)
+                self._mappings.setdefault(p, []).append(c)
 
         # Overide with target routing since it has priority
         # over component provides and id
@@ -735,8 +750,9 @@ class Resolver:
         """
         self._bake()
 
-        if what in self._cache:
-            return self._cache[what]
+        cached = self._cache.get(what)
+        if cached is not None:
+            return cached
 
         keep, unresolvedReason = self._provider(what)
 
@@ -745,8 +761,9 @@ class Resolver:
             self._cache[what] = Resolved(reason=unresolvedReason)
             return self._cache[what]
 
-        if keep in self._cache:
-            return self._cache[keep]
+        cached = self._cache.get(keep)
+        if cached is not None:
+            return cached
 
         if keep in stack:
             raise RuntimeError(
@@ -792,6 +809,10 @@ class Registry(DataClassJsonMixin):
     """The project associated with the registry."""
     manifests: dict[str, Manifest] = dt.field(default_factory=dict)
     """Dictionary of loaded manifests, keyed by their ID."""
+    _enabled: dict[str, list[Component]] = dt.field(default_factory=dict)
+    """Enabled components, keyed by target ID, computed on first use."""
+    _providers: Optional[dict[str, Component]] = None
+    """Components keyed by the specs they provide, built on first use."""
 
     def _append(self, m: Manifest) -> Manifest:
         """
@@ -812,6 +833,7 @@ class Registry(DataClassJsonMixin):
             )
 
         self.manifests[m.id] = m
+        self._providers = None
         return m
 
     def _extend(self, ms: list[Manifest]) -> list[Manifest]:
@@ -845,16 +867,20 @@ class Registry(DataClassJsonMixin):
         """
         Iterate over all enabled components for a given target.
 
+        The list is computed once per target, as the components are
+        resolved when the registry is loaded and do not change after.
+
         Args:
             target: The target to iterate over.
 
         Yields:
             The enabled Component objects.
         """
-        for c in self.iter(Component):
-            resolve = c.resolved[target.id]
-            if resolve.enabled:
-                yield c
+        enabled = self._enabled.get(target.id)
+        if enabled is None:
+            enabled = [c for c in self.iter(Component) if c.resolved[target.id].enabled]
+            self._enabled[target.id] = enabled
+        yield from enabled
 
     def lookup(
         self, name: str, type: Type[utils.T], includeProvides: bool = False
@@ -871,15 +897,17 @@ class Registry(DataClassJsonMixin):
             The manifest object, or None if no matching manifest was found.
         """
 
-        if name in self.manifests:
-            m = self.manifests[name]
-            if isinstance(m, type):
-                return m
+        m = self.manifests.get(name)
+        if isinstance(m, type):
+            return m
 
         if includeProvides and type is Component:
-            for m in self.iter(Component):
-                if name in m.provides:
-                    return m  # type: ignore
+            if self._providers is None:
+                self._providers = {}
+                for c in self.iter(Component):
+                    for p in c.provides:
+                        self._providers.setdefault(p, c)
+            return self._providers.get(name)  # type: ignore
 
         return None
 
@@ -10,7 +10,7 @@ _logger = logging.getLogger(__name__)
 
 
 def load(path: str):
-    _logger.info(f"Loading plugin {path}")
+    _logger.debug(f"Loading plugin {path}")
     spec = importlib.spec_from_file_location("plugin", path)
 
     if not spec or not spec.loader:
@@ -28,11 +28,11 @@ def load(path: str):
 
 
 def loadAll():
-    _logger.info("Loading plugins...")
+    _logger.debug("Loading plugins...")
 
     project = model.Project.topmost()
     if project is None:
-        _logger.info("Not in project, skipping plugin loading")
+        _logger.debug("Not in project, skipping plugin loading")
         return
     paths = list(
         map(lambda e: os.path.join(const.EXTERN_DIR, e), project.extern.keys())
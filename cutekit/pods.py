@@ -1,7 +1,6 @@
 import sys
 import logging
 from typing import Optional
-import docker  # type: ignore
 import os
 import dataclasses as dt
 
@@ -158,6 +157,8 @@ def _(args: PodCreateArgs):
     Create a new development pod with cutekit installed and the current
     project mounted at /project
     """
+    import docker  # type: ignore
+
     args.name = args.name or "default"
 
     project = model.Project.ensure()
@@ -208,6 +209,8 @@ def _(args: PodCreateArgs):
 
 @cli.command("k", "pod/kill", "Stop and remove a pod")
 def _(args: PodKillArgs):
+    import docker  # type: ignore
+
     args.name = args.name or "default"
 
     client = docker.from_env()
@@ -237,6 +240,8 @@ def _(args: PodKillArgs):
 
 @cli.command("l", "pod/list", "List all pods")
 def _():
+    import docker  # type: ignore
+
     client = docker.from_env()
     hasPods = False
 
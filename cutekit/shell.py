@@ -1,7 +1,6 @@
 import os
 import sys
 import hashlib
-import errno
 import subprocess
 import signal
 import re
@@ -123,11 +122,7 @@ def either(paths: list[str]) -> str | None:
 def mkdir(path: str) -> str:
     _logger.debug(f"Creating directory {path}")
 
-    try:
-        os.makedirs(path)
-    except OSError as exc:
-        if not (exc.errno == errno.EEXIST and os.path.isdir(path)):
-            raise
+    os.makedirs(path, exist_ok=True)
     return path
 
 
@@ -398,8 +393,9 @@ def latest(cmd: str) -> str:
 
     global LATEST_CACHE
 
-    if cmd in LATEST_CACHE:
-        return LATEST_CACHE[cmd]
+    cached = LATEST_CACHE.get(cmd)
+    if cached is not None:
+        return cached
 
     if "IN_NIX_SHELL" in os.environ:
         # By default, NixOS symlinks tools automatically
@@ -7,11 +7,15 @@ T = TypeVar("T")
 
 
 def uniqPreserveOrder(lst: list[T]) -> list[T]:
+    # Keeps the last occurrence of each item, walking backward lets us
+    # do it in a single pass instead of removing earlier duplicates.
+    seen: set[T] = set()
     result: list[T] = []
-    for i in lst:
-        if i in result:
-            result.remove(i)
-        result.append(i)
+    for i in reversed(lst):
+        if i not in seen:
+            seen.add(i)
+            result.append(i)
+    result.reverse()
     return result
 
 
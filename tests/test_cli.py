@@ -1,3 +1,7 @@
+import os
+import subprocess
+import sys
+
 from cutekit import cli, utils
 
 # --- Parse Values ----------------------------------------------------------- #
@@ -10,6 +14,12 @@ def test_parse_int_val():
     assert cli.parseValue("-2") == -2
 
 
+def test_parse_int_like_val():
+    assert cli.parseValue("1_000") == 1000
+    assert cli.parseValue("1e3") == "1e3"
+    assert cli.parseValue("+-3") == "+-3"
+
+
 def test_parse_true_val():
     assert cli.parseValue("true") is True
     assert cli.parseValue("True") is True
@@ -38,6 +48,8 @@ def test_parse_list_val():
     assert cli.parseValue("foo,bar") == ["foo", "bar"]
     assert cli.parseValue("'foo','bar'") == ["foo", "bar"]
     assert cli.parseValue('"foo","bar"') == ["foo", "bar"]
+    assert cli.parseValue("foo,,bar") == ["foo", "", "bar"]
+    assert cli.parseValue("foo bar,baz") == ["foo bar", "baz"]
 
 
 # --- Parse Args ------------------------------------------------------------- #
@@ -108,6 +120,34 @@ def test_parse_key_subkey_arg():
     assert arg.value is True
 
 
+def test_parse_key_subkey_arg_with_value():
+    args = cli.parseArg("--foo:bar=a=b")
+    assert len(args) == 1
+    arg = args[0]
+    assert isinstance(arg, cli.ArgumentToken)
+    assert arg.key == "foo"
+    assert arg.subkey == "bar"
+    assert arg.value == "a=b"
+
+
+def test_parse_arg_cached():
+    assert cli.parseArg("--foo=bar") is cli.parseArg("--foo=bar")
+    try:
+        cli.parseArg("--foo=bar")[0].value = "baz"  # type: ignore[misc]
+        assert False
+    except AttributeError:
+        pass
+
+
+def test_parse_long_arg_without_key():
+    for arg in ("--=bar", "--:bar", "--foo:=bar"):
+        try:
+            cli.parseArg(arg)
+            assert False, arg
+        except RuntimeError:
+            pass
+
+
 def extractParse(type: type[utils.T], args: list[str]) -> utils.T:
     schema = cli.Schema.extract(type)
     return schema.parse(args)
@@ -138,6 +178,15 @@ def test_cli_arg_str1():
     assert extractParse(StrArg, ["-v", "'foo, bar'"]).value == "foo, bar"
 
 
+def test_cli_arg_unknown():
+    for args in (["--nope"], ["-x"], ["-v", "1", "--values=1"]):
+        try:
+            extractParse(IntArg, args)
+            assert False, args
+        except ValueError:
+            pass
+
+
 class BoolArg:
     value: bool = cli.arg("v", "value")
 
@@ -259,3 +308,131 @@ def test_cli_operand_list_args():
 def test_cli_operand_list_args_empty():
     res = extractParse(ListOperandArg, [])
     assert res.value == []
+
+
+# --- Scan ------------------------------------------------------------------- #
+
+
+def test_scan_next():
+    s = cli.Scan("ab")
+    assert s.curr() == "a"
+    assert s.next() == "b"
+    assert s.next() == "\0"
+    assert s.eof()
+    assert s.next() == "\0"
+
+
+def test_cli_extract_cached():
+    a = cli.Schema.extract(BarArg)
+    b = cli.Schema.extract(BarArg)
+    assert a.args == b.args
+    assert a.args is not b.args
+
+    a.args.clear()
+    assert [f.longName for f in cli.Schema.extract(BarArg).args] == [
+        "bar",
+        "baz",
+        "foo",
+    ]
+
+
+def test_parse_args():
+    args = ["-v", "foo", "--", "bar", "--baz"]
+    toks = cli.parseArgs(args)
+    assert args == ["-v", "foo", "--", "bar", "--baz"]
+    assert len(toks) == 3
+    assert isinstance(toks[0], cli.ArgumentToken)
+    assert isinstance(toks[1], cli.OperandToken)
+    assert isinstance(toks[2], cli.ExtraToken)
+    assert toks[2].args == ["bar", "--baz"]
+
+
+def test_cli_parse_keeps_args():
+    args = ["-v", "1", "--value=2"]
+    assert extractParse(IntListArg, args).value == [1, 2]
+    assert args == ["-v", "1", "--value=2"]
+
+
+def test_cli_usage():
+    assert cli.Schema.extract(IntArg).usage() == "[-v, --value] "
+    assert cli.Schema.extract(StrDictArg).usage() == "[--value] "
+    assert cli.Schema.extract(ExtraArg).usage() == "[--value] [-- extra]"
+    assert cli.Schema.extract(ListOperandArg).usage() == "<value> "
+
+
+def test_scan_skip_whitespace():
+    s = cli.Scan("  \t a ")
+    assert s.skipWhitespace()
+    assert s.curr() == "a"
+    assert not s.skipWhitespace()
+    s.next()
+    assert s.skipWhitespace()
+    assert s.eof()
+    assert not s.skipWhitespace()
+
+
+class DiamondArg(FooArg):
+    pass
+
+
+class DiamondExtraArg(ExtraArg):
+    pass
+
+
+class DiamondChildArg(DiamondArg, DiamondExtraArg, BarArg):
+    foo: str = cli.arg("f", "foo")
+
+
+def test_cli_arg_diamond():
+    schema = cli.Schema.extract(DiamondChildArg)
+    assert [f.longName for f in schema.args] == ["bar", "baz", "foo", "value"]
+    assert schema.args[2].shortName == "f"
+    assert schema.extras is not None and schema.extras.longName == "extra"
+
+
+def test_cli_splice_args():
+    cmd = cli.Command(None, ["root"])
+    assert cmd._spliceArgs(["-v", "foo"]) == (["-v", "foo"], [])
+
+    cmd.subcommands["foo"] = cli.Command(None, ["root", "foo"])
+    assert cmd._spliceArgs(["-v", "--x=1", "foo", "-y"]) == (
+        ["-v", "--x=1"],
+        ["foo", "-y"],
+    )
+    assert cmd._spliceArgs(["-v", "--", "foo"]) == (["-v"], ["--", "foo"])
+    assert cmd._spliceArgs(["-v"]) == (["-v"], [])
+
+
+def test_parse_operand_arg():
+    args = cli.parseArg("foo-bar")
+    assert len(args) == 1
+    assert isinstance(args[0], cli.OperandToken)
+    assert args[0].value == "foo-bar"
+
+    assert cli.parseArg("-") == ()
+    try:
+        cli.parseArg("-a.")
+        assert False
+    except RuntimeError:
+        pass
+
+
+def test_cli_short_name_stays_lazy(tmp_path):
+    # A fresh interpreter, since other tests may already have imported
+    # the lazy modules.
+    script = (
+        "import sys, cutekit\n"
+        "sys.argv = ['ck', 'v']\n"
+        "assert cutekit.main() == 0\n"
+        "assert 'cutekit.builder' not in sys.modules\n"
+        "assert 'cutekit.export' not in sys.modules\n"
+    )
+    env = os.environ | {
+        "HOME": str(tmp_path),
+        "PYTHONPATH": os.pathsep.join(sys.path),
+    }
+    proc = subprocess.run(
+        [sys.executable, "-c", script], cwd=tmp_path, env=env, capture_output=True
+    )
+    assert proc.returncode == 0, proc.stderr.decode()
+    assert b"CuteKit v" in proc.stdout
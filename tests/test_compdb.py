@@ -0,0 +1,55 @@
+import io
+import os
+
+from cutekit import builder
+
+
+def test_expand_ninja():
+    env = {"a": "1", "b-c": "2", "d.e": "3"}
+    assert builder._expandNinja("$a ${a}x $b-c ${d.e}", env) == "1 1x 2 3"
+    assert builder._expandNinja("$$a $ a$:b", env) == "$a  a:b"
+    assert builder._expandNinja("$missing-", env) == ""
+
+
+def test_compdb():
+    w = builder._CompdbWriter(io.StringIO())
+    w.variable("cc", "gcc")
+    w.variable("ccflags", ["-O2", "", "-Wall"])
+    w.variable("cincs", "-Iinc $ccflags")
+    w.rule("cc", "$cc -c -o $out $in $ccflags $cincs $extra")
+    w.rule("ar", "ar rcs $out $in")
+    w.build("a.o", "cc", "a.c", variables={"extra": "-DTARGET=$cc"})
+
+    sub = w.sub(io.StringIO())
+    sub.build("b.o", "cc", "b.c", order_only=["gen.h"])
+    sub.build("lib.a", "ar", ["a.o", "b.o"])
+    sub.build("all", "phony", [], implicit=["lib.a"])
+    sub.build("nothing", "phony", [])
+
+    directory = os.getcwd()
+    assert w.compdb() == [
+        {
+            "directory": directory,
+            "command": "gcc -c -o a.o a.c -O2 -Wall -Iinc -O2 -Wall -DTARGET=gcc",
+            "file": "a.c",
+            "output": "a.o",
+        },
+        {
+            "directory": directory,
+            "command": "gcc -c -o b.o b.c -O2 -Wall -Iinc -O2 -Wall ",
+            "file": "b.c",
+            "output": "b.o",
+        },
+        {
+            "directory": directory,
+            "command": "ar rcs lib.a a.o b.o",
+            "file": "a.o",
+            "output": "lib.a",
+        },
+        {
+            "directory": directory,
+            "command": "",
+            "file": "lib.a",
+            "output": "all",
+        },
+    ]
@@ -0,0 +1,30 @@
+from cutekit import builder, model, rules
+
+
+def _targetScope(target: model.Target) -> builder.TargetScope:
+    return builder.TargetScope(model.Registry(model.Project("test")), target)
+
+
+def test_fingerprint(monkeypatch):
+    monkeypatch.delenv("MAKEFLAGS", raising=False)
+    scope = _targetScope(model.Target("stamp"))
+    stamp = builder._fingerprint(scope)
+    assert builder._fingerprint(scope) == stamp
+
+    # Plugins editing the rules table
+    rules.rules["cc"].args.append("-DPLUGIN_FLAG")
+    try:
+        assert builder._fingerprint(scope) != stamp
+    finally:
+        rules.rules["cc"].args.pop()
+    assert builder._fingerprint(scope) == stamp
+
+    # The LTO job mode picked from the environment
+    monkeypatch.setenv("MAKEFLAGS", "-j4 --jobserver-auth=3,4")
+    assert builder._fingerprint(scope) != stamp
+    monkeypatch.delenv("MAKEFLAGS")
+    assert builder._fingerprint(scope) == stamp
+
+    # Props end up in the target hashid
+    other = _targetScope(model.Target("stamp", props={"foo": "bar"}))
+    assert builder._fingerprint(other) != stamp
@@ -0,0 +1,36 @@
+from cutekit import builder, model
+
+
+def test_apply_lto():
+    t = model.Target(
+        "lto",
+        props={"ck-lto": "thin"},
+        tools={"cc": model.Tool("clang"), "ld": model.Tool("gcc")},
+    )
+    flags = ["-O2", "-flto=full", "-flto-partition=one"]
+    assert builder._applyLto(t, "ccflags", flags) == [
+        "-O2",
+        "-flto-partition=one",
+        "-flto=thin",
+    ]
+    assert builder._applyLto(t, "cincs", ["-flto"]) == ["-flto"]
+
+    try:
+        builder._applyLto(t, "ldflags", flags)
+        assert False
+    except RuntimeError:
+        pass
+
+    t.props["ck-lto"] = "full"
+    flags = ["-flto=thin", "-flto-odr-type-merging"]
+    assert builder._applyLto(t, "ldflags", flags) == ["-flto-odr-type-merging", "-flto"]
+
+    t.props["ck-lto"] = "off"
+    assert builder._applyLto(t, "ldflags", ["-flto", "-O2"]) == ["-O2"]
+
+    t.props["ck-lto"] = "fast"
+    try:
+        builder._applyLto(t, "ldflags", [])
+        assert False
+    except RuntimeError:
+        pass
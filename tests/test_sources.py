@@ -0,0 +1,87 @@
+import os
+
+from pathlib import Path
+
+from cutekit import builder, model
+
+
+def _componentScope(id: str, path: Path) -> builder.ComponentScope:
+    component = model.Component(id, path=str(path / "manifest.json"))
+    return builder.ComponentScope(
+        model.Registry(model.Project("test")), model.Target("other"), component
+    )
+
+
+def _names(paths: list[str]) -> list[str]:
+    return [os.path.basename(p) for p in paths]
+
+
+# --- Listings --------------------------------------------------------------- #
+
+
+def test_listing_reset(tmp_path: Path):
+    (tmp_path / "a.c").write_text("")
+    (tmp_path / "res").mkdir()
+    (tmp_path / "res" / "a.txt").write_text("")
+
+    scope = _componentScope("listing", tmp_path)
+    assert _names(scope.wilcard("*.c")) == ["a.c"]
+    assert _names(builder.listRes(scope.component)) == ["a.txt"]
+
+    (tmp_path / "b.c").write_text("")
+    (tmp_path / "res" / "b.txt").write_text("")
+    builder._resetCaches()
+
+    scope = _componentScope("listing", tmp_path)
+    assert _names(scope.wilcard("*.c")) == ["a.c", "b.c"]
+    assert sorted(_names(builder.listRes(scope.component))) == ["a.txt", "b.txt"]
+
+
+# --- Paths ------------------------------------------------------------------ #
+
+
+def test_relpath():
+    assert builder._relpath("src/foo/bar.c", "src/foo") == "bar.c"
+    assert builder._relpath("src/foo/a/b.c", "src/foo") == os.path.join("a", "b.c")
+    assert builder._relpath("src/foo/./a/b.c", "src/foo") == os.path.join("a", "b.c")
+    assert builder._relpath("/abs/foo/bar.c", "/abs/foo") == "bar.c"
+
+    try:
+        builder._relpath("src/foobar/baz.c", "src/foo")
+        assert False
+    except ValueError:
+        pass
+
+
+# --- Wildcards -------------------------------------------------------------- #
+
+
+def test_glob_exts():
+    assert builder._globExts(("*.c",)) == {".c"}
+    assert builder._globExts(("*.cpp", "*.cc")) == {".cpp", ".cc"}
+    assert builder._globExts(("*.S", "*.s")) == {os.path.normcase(".S"), ".s"}
+    assert builder._globExts(("*",)) is None
+    assert builder._globExts(("foo.c",)) is None
+    assert builder._globExts(("*.[ch]",)) is None
+    assert builder._globExts(("*.tar.gz",)) is None
+    assert builder._globExts(()) is None
+
+
+def test_wilcards(tmp_path: Path):
+    for name in ("a.c", "b.S", "c.s", "d.txt", "ab.c"):
+        (tmp_path / name).write_text("")
+    (tmp_path / "sub").mkdir()
+
+    scope = _componentScope("wilcards", tmp_path)
+    lower, upper, mixed, regex, everything = scope.wilcards(
+        [["*.s"], ["*.S"], ["*.c", "*.txt"], ["?.c"], []]
+    )
+    if os.path.normcase("S") == "S":
+        assert _names(lower) == ["c.s"]
+        assert _names(upper) == ["b.S"]
+    else:
+        assert _names(lower) == _names(upper) == ["b.S", "c.s"]
+    assert _names(mixed) == ["a.c", "ab.c", "d.txt"]
+    assert _names(regex) == ["a.c"]
+    assert _names(everything) == ["a.c", "ab.c", "b.S", "c.s", "d.txt", "sub"]
+    assert _names(scope.wilcard([])) == _names(everything)